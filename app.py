@@ -5,9 +5,13 @@
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 import joblib
+import gc
+import itertools
 from io import BytesIO
 from datetime import datetime
+from types import MappingProxyType
 
 # ReportLab
 from reportlab.lib.colors import HexColor
@@ -18,19 +22,31 @@ from reportlab.platypus import (
 )
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
+from reportlab import rl_config
+from reportlab.pdfbase.pdfmetrics import getFont
+
+# Skip per-attribute shape validation and load font metrics once, not per report
+rl_config.shapeChecking = 0
+getFont("Helvetica")
+getFont("Helvetica-Bold")
 
 # ============================================================
 # Load Artifacts
 # ============================================================
 
+# One cached loader per artifact, so each is loaded on first use and can be
+# released on its own
+@st.cache_resource
+def get_mca():
+    return joblib.load("mca_transformer.joblib")
+
 @st.cache_resource
-def load_artifacts():
-    mca = joblib.load("mca_transformer.joblib")
-    cluster_models = joblib.load("risk_band_cluster_models.joblib")
-    severity_map = joblib.load("severity_map.joblib")
-    return mca, cluster_models, severity_map
+def get_cluster_models():
+    return joblib.load("risk_band_cluster_models.joblib")
 
-mca, cluster_models, severity_map = load_artifacts()
+@st.cache_resource
+def get_severity_map():
+    return joblib.load("severity_map.joblib")
 
 # ============================================================
 # Feature Definitions (MUST MATCH TRAINING)
@@ -56,6 +72,9 @@ core_symptoms = [
     "Social_Weakness"
 ]
 
+# Columns the MCA transformer was fitted on, in training order
+MCA_COLS = core_symptoms
+
 # ============================================================
 # UI Questions
 # ============================================================
@@ -95,32 +114,42 @@ question_config = {
     }
 }
 
+# Fixed answer vocabularies, so answer frames carry compact integer codes
+CATEGORY_DTYPES = {col: pd.CategoricalDtype(question_config[col]["options"]) for col in features}
+
 # ============================================================
 # MDI & Risk Band
 # ============================================================
 
-def calculate_mdi(user_input):
-    return sum(severity_map.get(user_input[col], 1) for col in core_symptoms)
+# Severity per answer, resolved once; MDI is the sum over core symptoms
+severity_map = get_severity_map()
+SEVERITY_LOOKUP = {
+    col: {opt: severity_map.get(opt, 1) for opt in question_config[col]["options"]}
+    for col in core_symptoms
+}
 
-def assign_risk_band(mdi):
-    if mdi >= 8:
-        return "High"
-    elif mdi >= 4:
-        return "Moderate"
-    else:
-        return "Low"
+# Risk band indexed by MDI, covering every attainable score
+MODERATE_MDI = 4
+HIGH_MDI = 8
+MAX_MDI = sum(max(SEVERITY_LOOKUP[col].values()) for col in core_symptoms)
+BAND_TABLE = np.array(
+    ["Low"] * MODERATE_MDI
+    + ["Moderate"] * (HIGH_MDI - MODERATE_MDI)
+    + ["High"] * (MAX_MDI - HIGH_MDI + 1),
+    dtype=object
+)
 
 # ============================================================
 # Text Content
 # ============================================================
 
-diagnosis_map = {
+diagnosis_map = MappingProxyType({
     "Low": "Your responses suggest stable emotional well-being with healthy coping patterns.",
     "Moderate": "Your responses indicate ongoing stress that may be affecting balance and daily functioning.",
     "High": "Your responses reflect significant emotional strain that may be overwhelming your current coping capacity."
-}
+})
 
-meaning_map = {
+meaning_map = MappingProxyType({
     "Low": (
         "This suggests that current stressors are being managed effectively and "
         "no immediate intervention is indicated."
@@ -133,18 +162,18 @@ meaning_map = {
         "This suggests significant emotional distress where additional support or "
         "professional guidance may be beneficial."
     )
-}
+})
 
-suggestions_map = {
-    "Low": [
+suggestions_map = MappingProxyType({
+    "Low": (
         "Maintain consistent sleep and daily routines.",
         "Continue activities that help you relax or feel fulfilled.",
         "Stay socially connected with trusted people.",
         "Practice occasional self-reflection or journaling.",
         "Maintain healthy work–life boundaries.",
         "Respond early when stress levels increase."
-    ],
-    "Moderate": [
+    ),
+    "Moderate": (
         "Break daily tasks into smaller, manageable steps.",
         "Schedule intentional rest or recovery time.",
         "Reduce non-essential commitments temporarily.",
@@ -152,8 +181,8 @@ suggestions_map = {
         "Practice breathing or grounding exercises.",
         "Talk openly with a trusted person.",
         "Rebuild consistent sleep and meal routines."
-    ],
-    "High": [
+    ),
+    "High": (
         "Prioritize rest and reduce mental overload.",
         "Seek support instead of coping alone.",
         "Use grounding techniques like slow breathing.",
@@ -162,49 +191,90 @@ suggestions_map = {
         "Limit unnecessary stress exposure.",
         "Consider professional mental health support.",
         "Spend time in calming environments."
-    ]
-}
+    )
+})
+
+color_map = MappingProxyType({
+    "Low": "#27ae60",
+    "Moderate": "#f39c12",
+    "High": "#c0392b"
+})
+
+# Risk badge markup, one fixed fragment per band
+RISK_BADGE_HTML = MappingProxyType({
+    band: (
+        f'<div style="padding:12px;border-radius:6px;background-color:{color};'
+        f'color:white;font-weight:bold;text-align:center;">Risk Level: {band}</div>'
+    )
+    for band, color in color_map.items()
+})
 
 # ============================================================
 # Prediction
 # ============================================================
 
-def predict_cluster(user_input):
-    mdi = calculate_mdi(user_input)
-    risk_band = assign_risk_band(mdi)
+@st.cache_resource
+def precompute_all_predictions():
+    # The answer space is a small Cartesian product, so score every
+    # combination once and serve each click from a dict.
+    combos = list(itertools.product(*[question_config[c]["options"] for c in MCA_COLS]))
+
+    answers = pd.DataFrame(combos, columns=MCA_COLS).astype({c: CATEGORY_DTYPES[c] for c in MCA_COLS})
+
+    X = pd.DataFrame(get_mca().transform(answers)).fillna(0).to_numpy(copy=True)
+    X[:, :3] *= 2
+
+    # Gather severities through the categorical codes
+    code_matrix = np.column_stack([
+        np.array([SEVERITY_LOOKUP[c][opt] for opt in CATEGORY_DTYPES[c].categories], dtype=np.int8)[answers[c].cat.codes]
+        for c in MCA_COLS
+    ])
+    mdis = code_matrix.sum(axis=1)
+    bands = np.take(BAND_TABLE, mdis)
+
+    # KMeans assignment is the nearest centre; computing it directly skips
+    # sklearn's input validation
+    centers = {band: model.cluster_centers_ for band, model in get_cluster_models().items()}
+    cluster_ids = np.zeros(len(combos), dtype=int)
+    for risk_band, band_centers in centers.items():
+        mask = bands == risk_band
+        sq_dist = ((X[mask][:, None, :] - band_centers[None, :, :]) ** 2).sum(axis=2)
+        cluster_ids[mask] = sq_dist.argmin(axis=1)
+
+    lookup = {
+        combo: (int(mdi), risk_band, int(cluster_id))
+        for combo, mdi, risk_band, cluster_id in zip(combos, mdis, bands, cluster_ids)
+    }
 
-    df = pd.DataFrame([user_input]).astype(str)
-    X_mca = pd.DataFrame(mca.transform(df[core_symptoms])).fillna(0)
-    X_mca.iloc[:, :3] *= 2
+    # The models are not needed once the table is built
+    get_mca.clear()
+    get_cluster_models.clear()
+    gc.collect()
 
-    model = cluster_models[risk_band]
-    cluster_id = int(model.predict(X_mca)[0])
+    return lookup
 
-    return mdi, risk_band, cluster_id
+LOOKUP = precompute_all_predictions()
+
+def predict_cluster(user_input):
+    return LOOKUP[tuple(user_input[c] for c in MCA_COLS)]
 
 # ============================================================
 # PDF GENERATOR
 # ============================================================
 
-def generate_pdf(user_name, mdi, risk_band, diagnosis, meaning, suggestions):
+@st.cache_data(max_entries=256, show_spinner=False)
+def generate_pdf(user_name, mdi, risk_band, diagnosis, meaning, suggestions, generated_at):
     buffer = BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=letter, leftMargin=48, rightMargin=48)
 
     styles = getSampleStyleSheet()
     story = []
 
-    risk_colors = {
-        "Low": HexColor("#27ae60"),
-        "Moderate": HexColor("#f39c12"),
-        "High": HexColor("#c0392b")
-    }
-
     # Title
     story.append(Paragraph("<b>Mental Well-Being Report</b>", styles["Title"]))
     story.append(Spacer(1, 12))
 
-    now = datetime.now().strftime("%d/%m/%Y, %I:%M %p")
-    meta = f"<b>Date Generated:</b> {now}"
+    meta = f"<b>Date Generated:</b> {generated_at}"
     if user_name:
         meta += f"<br/><b>Prepared For:</b> {user_name}"
     story.append(Paragraph(meta, styles["Normal"]))
@@ -213,7 +283,7 @@ def generate_pdf(user_name, mdi, risk_band, diagnosis, meaning, suggestions):
     # Risk Badge (TABLE-BASED)
     risk_table = Table([[f"Risk Level: {risk_band}"]], colWidths=[400], rowHeights=[34])
     risk_table.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, -1), risk_colors[risk_band]),
+        ("BACKGROUND", (0, 0), (-1, -1), HexColor(color_map[risk_band])),
         ("TEXTCOLOR", (0, 0), (-1, -1), colors.white),
         ("ALIGN", (0, 0), (-1, -1), "CENTER"),
         ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
@@ -267,31 +337,45 @@ def generate_pdf(user_name, mdi, risk_band, diagnosis, meaning, suggestions):
     ))
 
     doc.build(story)
-    buffer.seek(0)
-    return buffer
+    return buffer.getvalue()
 
 # ============================================================
 # STREAMLIT UI
 # ============================================================
 
 st.title("Mental Health Cluster Insight Tool")
-user_name = st.text_input("Enter your name (optional)")
-
-user_input = {f: st.selectbox(question_config[f]["question"], question_config[f]["options"]) for f in features}
+# Answers are submitted together, so editing them doesn't rerun the script
+with st.form("responses"):
+    user_name = st.text_input("Enter your name (optional)")
+    user_input = {
+        f: st.selectbox(question_config[f]["question"], question_config[f]["options"], key=f)
+        for f in features
+    }
+    submitted = st.form_submit_button("Generate My Well-Being Insights")
 
-if st.button("Generate My Well-Being Insights"):
+if submitted:
     mdi, risk_band, _ = predict_cluster(user_input)
 
-    st.success(f"Risk Level: {risk_band}")
+    st.markdown(RISK_BADGE_HTML[risk_band], unsafe_allow_html=True)
     st.write(diagnosis_map[risk_band])
 
-    pdf = generate_pdf(
-        user_name,
-        mdi,
-        risk_band,
-        diagnosis_map[risk_band],
-        meaning_map[risk_band],
-        suggestions_map[risk_band]
+    # Built only when the download is clicked; most visitors never download
+    def build_report():
+        return generate_pdf(
+            user_name,
+            mdi,
+            risk_band,
+            diagnosis_map[risk_band],
+            meaning_map[risk_band],
+            suggestions_map[risk_band],
+            # Minute resolution, as printed, so re-downloads reuse the cached report
+            datetime.now().strftime("%d/%m/%Y, %I:%M %p")
+        )
+
+    st.download_button(
+        "Download Wellness Report (PDF)",
+        build_report,
+        "Wellness_Report.pdf",
+        mime="application/pdf",
+        on_click="ignore"
     )
-
-    st.download_button("Download Wellness Report (PDF)", pdf, "Wellness_Report.pdf")